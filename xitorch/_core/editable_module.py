@@ -1,15 +1,15 @@
 import inspect
 import warnings
 from abc import abstractmethod
-import copy
 import torch
-from typing import Sequence, Union, Dict, List
+from typing import Sequence, Union, Dict, List, Optional
 from xitorch._utils.exceptions import GetSetParamsError
 from xitorch._utils.attr import get_attr, set_attr, del_attr
 
 __all__ = ["EditableModule"]
 
-torch_float_type = [torch.float32, torch.float, torch.float64, torch.float16]
+# frozenset because it is only used for the membership check of every traversed tensor
+torch_float_type = frozenset([torch.float32, torch.float, torch.float64, torch.float16])
 
 class EditableModule(object):
     """
@@ -39,13 +39,25 @@ class EditableModule(object):
         return len(params)
 
     def cached_getparamnames(self, methodname: str, refresh: bool = False) -> List[str]:
-        # getparamnames, but cached, so it is only called once
-        if not hasattr(self, "_paramnames_"):
-            self._paramnames_: Dict[str, List[str]] = {}
-
-        if methodname not in self._paramnames_:
-            self._paramnames_[methodname] = self.getparamnames(methodname)
-        return self._paramnames_[methodname]
+        # getparamnames, but cached, so it is only called once (unless refresh
+        # is True, e.g. when the object's parameters have been rearranged)
+        paramnames_dict: Optional[Dict[str, List[str]]] = self.__dict__.get("_paramnames_", None)
+        if paramnames_dict is None:
+            paramnames_dict = {}
+            self._paramnames_: Dict[str, List[str]] = paramnames_dict
+
+        paramnames = None if refresh else paramnames_dict.get(methodname, None)
+        if paramnames is None:
+            paramnames = self.getparamnames(methodname)
+            paramnames_dict[methodname] = paramnames
+            if refresh:
+                # the unique parameters are derived from the names, so they
+                # must be recomputed as well
+                unique_params_idxs = self.__dict__.get("_unique_params_idxs", None)
+                if unique_params_idxs is not None:
+                    unique_params_idxs.pop(methodname, None)
+                    self._unique_params_maps.pop(methodname, None)
+        return paramnames
 
     @abstractmethod
     def getparamnames(self, methodname: str, prefix: str = "") -> List[str]:
@@ -123,53 +135,46 @@ class EditableModule(object):
             return [allparams[i] for i in idxs]
 
     def setuniqueparams(self, methodname: str, *uniqueparams) -> int:
-        nparams = self._number_of_params[methodname]
-        allparams = [None for _ in range(nparams)]
+        # maps[i] is the index of the unique parameter for the i-th parameter
         maps = self._unique_params_maps[methodname]
-
-        for j in range(len(uniqueparams)):
-            jmap = maps[j]
-            p = uniqueparams[j]
-            for i in jmap:
-                allparams[i] = p
-
+        nunique = len(self._unique_params_idxs[methodname])
+        if len(uniqueparams) != nunique:
+            raise RuntimeError("The number of unique parameters for %s must be %d, got %d" %
+                               (methodname, nunique, len(uniqueparams)))
+        allparams = [uniqueparams[j] for j in maps]
         return self.setparams(methodname, *allparams)
 
     def _get_unique_params_idxs(self, methodname: str,
                                 allparams: Union[Sequence[torch.Tensor], None] = None) -> Sequence[int]:
 
-        if not hasattr(self, "_unique_params_idxs"):
-            self._unique_params_idxs = {}  # type: Dict[str,Sequence[int]]
-            self._unique_params_maps = {}
-            self._number_of_params = {}
+        unique_params_idxs: Optional[Dict[str, Sequence[int]]] = self.__dict__.get("_unique_params_idxs", None)
+        if unique_params_idxs is None:
+            unique_params_idxs = {}
+            self._unique_params_idxs: Dict[str, Sequence[int]] = unique_params_idxs
+            self._unique_params_maps: Dict[str, List[int]] = {}
 
-        if methodname in self._unique_params_idxs:
-            return self._unique_params_idxs[methodname]
+        idxs_cached = unique_params_idxs.get(methodname, None)
+        if idxs_cached is not None:
+            return idxs_cached
         if allparams is None:
             allparams = self.getparams(methodname)
 
         # get the unique ids
-        ids = []  # type: List[int]
-        idxs = []
-        idx_map = []  # type: List[List[int]]
+        id2j = {}  # type: Dict[int, int]
+        idxs = []  # type: List[int]
+        idx_map = []  # type: List[int]
         for i in range(len(allparams)):
-            param = allparams[i]
-            id_param = id(param)
+            id_param = id(allparams[i])
 
             # search the id if it has been added to the list
-            try:
-                jfound = ids.index(id_param)
-                idx_map[jfound].append(i)
-                continue
-            except ValueError:
-                pass
-
-            ids.append(id_param)
-            idxs.append(i)
-            idx_map.append([i])
-
-        self._number_of_params[methodname] = len(allparams)
-        self._unique_params_idxs[methodname] = idxs
+            j = id2j.get(id_param, None)
+            if j is None:
+                j = len(idxs)
+                id2j[id_param] = j
+                idxs.append(i)
+            idx_map.append(j)
+
+        unique_params_idxs[methodname] = idxs
         self._unique_params_maps[methodname] = idx_map
         return idxs
 
@@ -337,8 +342,7 @@ class EditableModule(object):
 
         # copy the tensors and require them to be differentiable
         copy_tensors0 = [tensor.clone().detach().requires_grad_() for tensor in all_tensors]
-        copy_tensors = copy.copy(copy_tensors0)
-        _set_tensors(self, copy_tensors)
+        _set_tensors(self, copy_tensors0)
 
         # run the method and see which one has the gradients
         output = method(*args, **kwargs)
@@ -348,8 +352,7 @@ class EditableModule(object):
         grad_tensors = torch.autograd.grad(output, copy_tensors0, retain_graph=True, allow_unused=True)
 
         # return the original tensor
-        all_tensors_copy = copy.copy(all_tensors)
-        _set_tensors(self, all_tensors_copy)
+        _set_tensors(self, all_tensors)
 
         names = []
         params = []
@@ -362,9 +365,28 @@ class EditableModule(object):
         return names, params
 
 ############################ traversing functions ############################
-def _traverse_obj(obj, prefix, action, crit, max_depth=20, exception_ids=None):
+# (hasdict, hasiter) of the exact types commonly stored in the objects, so
+# they can be looked up without calling hasattr for every element.
+# Strings are marked as non-iterable because they never contain tensors.
+# Other types (including the subclasses of these types) are checked with hasattr.
+_elmt_kinds = {
+    int: (False, False),
+    float: (False, False),
+    bool: (False, False),
+    complex: (False, False),
+    str: (False, False),
+    type(None): (False, False),
+    list: (False, True),
+    tuple: (False, True),
+    dict: (False, True),
+}
+
+def _traverse_obj(obj, prefix, action, max_depth=20, exception_ids=None, kind=None):
     """
-    Traverse an object to get/set variables that are accessible through the object.
+    Traverse an object to get/set floating point tensors that are accessible
+    through the object. ``action`` is called for every tensor found.
+    ``kind`` is the ``(hasdict, hasiter)`` of the object if it has been
+    determined by the caller.
     """
     if exception_ids is None:
         # None is set as default arg to avoid expanding list for multiple
@@ -372,29 +394,46 @@ def _traverse_obj(obj, prefix, action, crit, max_depth=20, exception_ids=None):
         exception_ids = set()
 
     if isinstance(obj, torch.nn.Module):
-        generators = [obj._parameters.items(), obj._modules.items()]
-        name_format = "{prefix}{key}"
-        objdicts = [obj._parameters, obj._modules]
-    elif hasattr(obj, "__dict__"):
-        generators = [obj.__dict__.items()]
-        name_format = "{prefix}{key}"
-        objdicts = [obj.__dict__]
-    elif hasattr(obj, "__iter__"):
-        generators = [obj.items() if isinstance(obj, dict) else enumerate(obj)]
-        name_format = "{prefix}[{key}]"
-        objdicts = [obj]
+        # container modules usually have no parameters and the leaf modules
+        # have no submodules, so only visit the non-empty dictionaries
+        params, modules = obj._parameters, obj._modules
+        if params and modules:
+            objdicts = (params, modules)
+        elif params:
+            objdicts = (params,)
+        elif modules:
+            objdicts = (modules,)
+        else:
+            return
+        iskeyed = True
+        # the names are "{prefix}{key}"
+        name_start, name_end = prefix, ""
     else:
-        raise RuntimeError("The object must be iterable or keyable")
+        if kind is None:
+            kind = (hasattr(obj, "__dict__"), hasattr(obj, "__iter__"))
+        if kind[0]:
+            objdicts = (obj.__dict__,)
+            iskeyed = True
+            name_start, name_end = prefix, ""
+        elif kind[1]:
+            objdicts = (obj,)
+            iskeyed = isinstance(obj, dict)
+            # the names are "{prefix}[{key}]"
+            name_start, name_end = prefix + "[", "]"
+        else:
+            raise RuntimeError("The object must be iterable or keyable")
 
-    for generator, objdict in zip(generators, objdicts):
-        for key, elmt in generator:
-            name = name_format.format(prefix=prefix, key=key)
-            if crit(elmt):
+    for objdict in objdicts:
+        for key, elmt in (objdict.items() if iskeyed else enumerate(objdict)):
+            name = f"{name_start}{key}{name_end}"
+            if isinstance(elmt, torch.Tensor) and elmt.dtype in torch_float_type:
                 action(elmt, name, objdict, key)
                 continue
 
-            hasdict = hasattr(elmt, "__dict__")
-            hasiter = hasattr(elmt, "__iter__")
+            elmt_kind = _elmt_kinds.get(type(elmt), None)
+            if elmt_kind is None:
+                elmt_kind = (hasattr(elmt, "__dict__"), hasattr(elmt, "__iter__"))
+            hasdict, hasiter = elmt_kind
             if hasdict or hasiter:
                 # add exception to avoid infinite loop if there is a mutual dependant on objects
                 if id(elmt) in exception_ids:
@@ -405,10 +444,10 @@ def _traverse_obj(obj, prefix, action, crit, max_depth=20, exception_ids=None):
                 if max_depth > 0:
                     _traverse_obj(elmt,
                                   action=action,
-                                  crit=crit,
                                   prefix=name + "." if hasdict else name,
                                   max_depth=max_depth - 1,
-                                  exception_ids=exception_ids)
+                                  exception_ids=exception_ids,
+                                  kind=elmt_kind)
                 else:
                     raise RecursionError("Maximum number of recursion reached")
 
@@ -441,8 +480,7 @@ def _get_tensors(obj, prefix="", max_depth=20):
         names.append(name)
 
     # traverse down the object to collect the tensors
-    crit = lambda elmt: isinstance(elmt, torch.Tensor) and elmt.dtype in torch_float_type
-    _traverse_obj(obj, action=action, crit=crit, prefix=prefix, max_depth=max_depth)
+    _traverse_obj(obj, action=action, prefix=prefix, max_depth=max_depth)
     return res, names
 
 def _set_tensors(obj, all_params, max_depth=20):
@@ -459,8 +497,12 @@ def _set_tensors(obj, all_params, max_depth=20):
         Maximum recursive depth to avoid infinitely running program.
         If the maximum depth is reached, then raise a RecursionError.
     """
+    params_iter = iter(all_params)
+
     def action(elmt, name, objdict, key):
-        objdict[key] = all_params.pop(0)
+        param = next(params_iter, None)
+        if param is None:
+            raise RuntimeError("Not enough tensors to be set, missing the tensor for %s" % name)
+        objdict[key] = param
     # traverse down the object to collect the tensors
-    crit = lambda elmt: isinstance(elmt, torch.Tensor) and elmt.dtype in torch_float_type
-    _traverse_obj(obj, action=action, crit=crit, prefix="", max_depth=max_depth)
+    _traverse_obj(obj, action=action, prefix="", max_depth=max_depth)
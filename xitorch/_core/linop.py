@@ -548,7 +548,7 @@ class LinearOperator(EditableModule):
     #     return this_method is not base_method
 
     def __assert_if_init_executed(self):
-        if not hasattr(self, "_shape"):
+        if "_shape" not in self.__dict__:
             raise RuntimeError("super().__init__ must be executed first")
 
 ############## special linear operators ##############
@@ -684,18 +684,27 @@ class MatrixLinearOperator(LinearOperator):
             _suppress_hermit_warning=True,
         )
         self.mat = mat
+        # non-batched matrices can be applied to the (batched) vectors from the
+        # right side directly, without unsqueezing and squeezing the vectors
+        self._is_2d = mat.dim() == 2
 
     def __repr__(self):
         return "MatrixLinearOperator with shape %s:\n   %s" % \
             (_shape2str(self.shape), _indent(self.mat.__repr__(), 3))
 
     def _mv(self, x: torch.Tensor) -> torch.Tensor:
+        if self._is_2d:
+            # x @ mat^T
+            return torch.nn.functional.linear(x, self.mat)
         return torch.matmul(self.mat, x.unsqueeze(-1)).squeeze(-1)
 
     def _mm(self, x: torch.Tensor) -> torch.Tensor:
         return torch.matmul(self.mat, x)
 
     def _rmv(self, x: torch.Tensor) -> torch.Tensor:
+        if self._is_2d:
+            # x @ mat^*
+            return torch.matmul(x, self.mat.conj())
         return torch.matmul(self.mat.transpose(-2, -1).conj(), x.unsqueeze(-1)).squeeze(-1)
 
     def _rmm(self, x: torch.Tensor) -> torch.Tensor:
@@ -144,13 +144,20 @@ class MultiSiblingPureFunction(PureFunction):
         self.cumsum_idx = [0] * (self.npfuncs + 1)
         for i, pfunc in enumerate(self.pfuncs):
             objparams = pfunc._get_all_obj_params_init()
-            res = res + objparams
+            res.extend(objparams)
             self.cumsum_idx[i + 1] = self.cumsum_idx[i] + len(objparams)
+
+        # the parameters of each sibling do not change their position, so
+        # store the pairs of siblings and their slices to be set quickly
+        self._pfunc_slices = tuple(
+            (pfunc, slice(self.cumsum_idx[i], self.cumsum_idx[i + 1]))
+            for i, pfunc in enumerate(self.pfuncs)
+        )
         return res
 
     def _set_all_obj_params(self, allobjparams: List):
-        for i, pfunc in enumerate(self.pfuncs):
-            pfunc._set_all_obj_params(allobjparams[self.cumsum_idx[i]:self.cumsum_idx[i + 1]])
+        for pfunc, objparams_slice in self._pfunc_slices:
+            pfunc._set_all_obj_params(allobjparams[objparams_slice])
 
 def _check_identical_objs(objs1: List, objs2: List) -> bool:
     for obj1, obj2 in zip(objs1, objs2):
@@ -193,6 +193,45 @@ def test_get_unique_params_leaves():
     params = model.getuniqueparams(methodname="method_list_correct")
     assert len(params) == 6
 
+def test_set_unique_params_wrong_number():
+    # setuniqueparams must raise if the number of unique parameters is wrong
+    a = torch.tensor([1.], requires_grad=True)
+    model = ModuleTest(a)
+    methodname = "method_list_correct"
+    params = model.getuniqueparams(methodname=methodname)
+    with pytest.raises(RuntimeError):
+        model.setuniqueparams(methodname, *params, params[0])
+    with pytest.raises(RuntimeError):
+        model.setuniqueparams(methodname, *params[:-1])
+    model.setuniqueparams(methodname, *params)
+
+def test_cached_getparamnames_refresh():
+    # test if refresh in cached_getparamnames updates the cached names and
+    # the unique parameters
+
+    class RefreshModule(EditableModule):
+        def __init__(self, a: torch.Tensor, b: torch.Tensor) -> None:
+            self.a = a
+            self.b = b
+            self.names = ["a", "b"]
+
+        def getparamnames(self, methodname: str, prefix: str = "") -> List[str]:
+            return [prefix + name for name in self.names]
+
+    a = torch.tensor([1.])
+    b = torch.tensor([2.])
+    model = RefreshModule(a, b)
+    assert model.cached_getparamnames("method") == ["a", "b"]
+    params = model.getuniqueparams("method")
+    assert len(params) == 2
+
+    model.names = ["a"]
+    assert model.cached_getparamnames("method") == ["a", "b"]
+    assert model.cached_getparamnames("method", refresh=True) == ["a"]
+    params = model.getuniqueparams("method")
+    assert len(params) == 1
+    assert params[0] is a
+
 ##############
 # test the wrap function to make it a functional
 def test_edit_simple():
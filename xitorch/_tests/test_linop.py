@@ -1,4 +1,5 @@
 import warnings
+import pytest
 import torch
 from xitorch import LinearOperator, EditableModule
 from xitorch.linalg import solve, symeig
@@ -59,12 +60,26 @@ class LinOp2(BaseLinOp):
     def __init__(self, mat, is_hermitian=False):
         super(LinOp2, self).__init__(mat, is_hermitian)
         self.implemented_methods = ["_mv", "_rmv"]
+        # the cache is a plain attribute set here, so the float tensors of the
+        # object do not change when ._rmv is called
+        self._mat_T = mat.transpose(-2, -1)
+        self._mat_T_src = mat
 
     def _mv(self, x):
         return torch.matmul(self.mat, x.unsqueeze(-1)).squeeze(-1)
 
     def _rmv(self, x):
-        return torch.matmul(self.mat.transpose(-2, -1), x.unsqueeze(-1)).squeeze(-1)
+        return torch.matmul(self._get_mat_T(), x.unsqueeze(-1)).squeeze(-1)
+
+    def _get_mat_T(self):
+        # the transposed matrix is cached, but it must be recomputed if .mat
+        # is replaced (e.g. with setparams) or if the gradient is required and
+        # the cached view is not tracked by autograd (e.g. made under no_grad)
+        requires_grad = self.mat.requires_grad and torch.is_grad_enabled()
+        if self._mat_T_src is not self.mat or (requires_grad and self._mat_T.grad_fn is None):
+            self._mat_T = self.mat.transpose(-2, -1)
+            self._mat_T_src = self.mat
+        return self._mat_T
 
 class NotLinOp1(BaseLinOp):
     # LinearOperator where only ._mv is implemented (bare minimum)
@@ -75,64 +90,85 @@ class NotLinOp1(BaseLinOp):
     def _mv(self, x):
         return torch.matmul(self.mat, x.unsqueeze(-1)).squeeze(-1) + 1
 
-def test_linop0_err():
-    mat = torch.rand((3, 1, 2))
-    try:
-        linop = LinOpWithoutMv(mat)
-        msg = ("A RuntimeError must be raised when creating a "
-               "LinearOperator without ._mv()")
-        assert False, msg
-    except RuntimeError:
-        pass
-
-def test_linop_no_getparamnames_err():
-    mat = torch.rand((3, 2, 2))
+@pytest.fixture(scope="module")
+def rand_pool():
+    # pool of buffers (one per shape and dtype) shared by the tests in this
+    # module, refilled in-place instead of allocating new tensors
+    buffers = {}
+    yield buffers
+    buffers.clear()
+
+@pytest.fixture
+def rand_buf(rand_pool):
+    # draws uniform random tensors from the pool, a test must not draw two
+    # tensors with the same shape and dtype as they would share the memory
+    drawn = set()
+
+    def get(shape, dtype=torch.float32):
+        key = (tuple(shape), dtype)
+        assert key not in drawn, "%s is already drawn in this test" % str(key)
+        drawn.add(key)
+        buf = rand_pool.get(key, None)
+        if buf is None:
+            buf = torch.empty(shape, dtype=dtype)
+            rand_pool[key] = buf
+        return buf.uniform_()
+
+    return get
+
+@pytest.fixture(scope="module")
+def small_mat():
+    # shared by the tests in this module, none of them modifies it
+    return torch.rand((2, 4, 2, 3))
+
+@pytest.fixture(scope="module")
+def small_mat64():
+    return torch.rand((2, 4, 2, 3), dtype=torch.float64)
+
+def test_linop0_err(rand_buf):
+    # a RuntimeError must be raised when creating a LinearOperator without ._mv()
+    mat = rand_buf((3, 1, 2))
+    with pytest.raises(RuntimeError):
+        LinOpWithoutMv(mat)
+
+def test_linop_no_getparamnames_err(rand_buf):
+    mat = rand_buf((3, 2, 2))
     linop = LinOpWithoutGetParamNames(mat)
-    x = torch.rand(2, 4)
+    x = rand_buf((2, 4))
     b = linop.mm(x)
     with torch.no_grad():
         solve(linop, b)
-    try:
+    # a RuntimeError must be raised when using a LinearOperator without
+    # ._getparamnames() in xitorch functions
+    with pytest.raises(RuntimeError):
         with torch.enable_grad():
             solve(linop, b)
-        msg = ("A RuntimeError must be raised when using a LinearOperator "
-               "without ._getparamnames() in xitorch functions")
-        assert False, msg
-    except RuntimeError:
-        pass
-
-def test_linop_no_init_err():
-    mat = torch.rand((3, 1, 2))
-    x = torch.rand(2)
+
+def test_linop_no_init_err(rand_buf):
+    mat = rand_buf((3, 1, 2))
+    x = rand_buf((2,))
     linop = LinOpWithoutInit(mat)
-    try:
-        y = linop.mv(x)
-        msg = ("A RuntimeError must be raised when a LinearOperator "
-               "is called without .__init__() called first")
-        assert False, msg
-    except RuntimeError as e:
-        assert "__init__" in str(e), 'The error message must contain "__init__"'
-
-def test_linop1_shape1_err():
-    mat = torch.rand(3)
-    mat2 = torch.rand((3, 2))
-    try:
-        linop = LinOp1(mat)
-        assert False, "A RuntimeError must be raised when creating a LinearOperator with 1 dimension"
-    except RuntimeError:
-        pass
-
-    try:
-        linop = LinOp1(mat2, is_hermitian=True)
-        assert False, "A RuntimeError must be raised when creating a Hermitian LinearOperator without square shape"
-    except RuntimeError:
-        pass
-
-def test_linop1_mm():
+    # a RuntimeError must be raised when a LinearOperator is called without
+    # .__init__() called first and the message must contain "__init__"
+    with pytest.raises(RuntimeError, match="__init__"):
+        linop.mv(x)
+
+def test_linop1_shape1_err(rand_buf):
+    mat = rand_buf((3,))
+    mat2 = rand_buf((3, 2))
+    # LinearOperator with 1 dimension
+    with pytest.raises(RuntimeError):
+        LinOp1(mat)
+
+    # Hermitian LinearOperator without square shape
+    with pytest.raises(RuntimeError):
+        LinOp1(mat2, is_hermitian=True)
+
+def test_linop1_mm(small_mat, rand_buf):
     # test if mm done correctly if not implemented
-    mat = torch.rand((2, 4, 2, 3))
-    x = torch.rand((3, 2))
-    xv = torch.rand((3,))
+    mat = small_mat
+    x = rand_buf((3, 2))
+    xv = rand_buf((3,))
 
     linop = LinOp1(mat)
     ymv = linop.mv(xv)
@@ -141,17 +177,17 @@ def test_linop1_mm():
     assert torch.allclose(ymv, torch.matmul(mat, xv))
     assert torch.allclose(ymm, torch.matmul(mat, x))
 
-def test_linop1_fullmatrix():
-    mat = torch.rand((2, 4, 2, 3), dtype=torch.float64)
+def test_linop1_fullmatrix(small_mat64):
+    mat = small_mat64
     linop = LinOp1(mat)
     linop_mat = linop.fullmatrix()
     assert torch.allclose(linop_mat, mat)
 
-def test_linop1_rmm():
+def test_linop1_rmm(small_mat, rand_buf):
     # test if rmv and rmm done correctly if not implemented
-    mat = torch.rand((2, 4, 2, 3))
-    rx = torch.rand((2, 3))
-    rxv = torch.rand((2,))
+    mat = small_mat
+    rx = rand_buf((2, 3))
+    rxv = rand_buf((2,))
 
     linop = LinOp1(mat)
     ymv = linop.rmv(rxv)
@@ -162,11 +198,11 @@ def test_linop1_rmm():
     ymm_true = torch.matmul(mat.transpose(-2, -1), rx)
     assert torch.allclose(ymm, ymm_true)
 
-def test_linop2_rmm():
+def test_linop2_rmm(small_mat, rand_buf):
     # test if rmm done correctly if not implemented
-    mat = torch.rand((2, 4, 2, 3))
-    rx = torch.rand((2, 3))
-    rxv = torch.rand((2,))
+    mat = small_mat
+    rx = rand_buf((2, 3))
+    rxv = rand_buf((2,))
 
     linop = LinOp2(mat)
     ymv = linop.rmv(rxv)
@@ -175,6 +211,37 @@ def test_linop2_rmm():
     ymm = linop.rmm(rx)
     assert torch.allclose(ymm, torch.matmul(mat.transpose(-2, -1), rx))
 
+def test_linop2_rmv_grad_after_no_grad():
+    # the cached transposed matrix made under no_grad must not be reused when
+    # the grad is enabled, otherwise the gradient is silently lost
+    mat = torch.rand((3, 4), requires_grad=True)
+    linop = LinOp2(mat)
+    x = torch.ones((3,))
+    with torch.no_grad():
+        linop.rmv(x)
+    linop.rmv(x).sum().backward()
+    assert mat.grad is not None
+    assert torch.allclose(mat.grad, torch.ones_like(mat))
+
+def test_linop2_assertparams_after_rmv():
+    # the cached transposed matrix must not break the parameter checks
+    mat = torch.rand((3, 4), requires_grad=True)
+    linop = LinOp2(mat)
+    linop.rmv(torch.rand((3,)))
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        linop.assertparams(linop.mv, torch.rand((4,)))
+        linop.assertparams(linop.rmv, torch.rand((3,)))
+        assert len(w) == 0
+
+    # the restored cache must still be tracked by autograd
+    rx = torch.ones((3,))
+    with torch.no_grad():
+        linop.rmv(rx)
+    linop.assertparams(linop.rmv, rx)
+    linop.rmv(rx).sum().backward()
+    assert torch.allclose(mat.grad, torch.ones_like(mat))
+
 def test_linop_repr():
     dtype = torch.float32
     device = torch.device("cpu")
@@ -200,71 +267,46 @@ def test_linop_repr():
     erepr = ["AddLinearOperator", "(2, 3, 2)"]
     _assert_str_contains(d.__repr__(), drepr)
 
-def test_linop_mat_hermit_err():
+def test_linop_mat_hermit_err(rand_buf):
     torch.manual_seed(100)
-    mat = torch.rand(3, 3)
-    mat2 = torch.rand(3, 4)
-    msg = "Expecting a RuntimeError for non-symmetric matrix "\
-          "indicated as a Hermitian"
+    mat = rand_buf((3, 3))
+    mat2 = rand_buf((3, 4))
 
-    try:
+    # non-symmetric matrix indicated as a Hermitian
+    with pytest.raises(RuntimeError):
         LinearOperator.m(mat, is_hermitian=True)
-        assert False, msg
-    except RuntimeError:
-        pass
 
-    try:
+    with pytest.raises(RuntimeError):
         LinearOperator.m(mat2, is_hermitian=True)
-        assert False, msg
-    except RuntimeError:
-        pass
-
-def test_linop_op_err():
-    mat1 = torch.rand(3, 4)
-    vec1 = torch.rand(3)
-    vec2 = torch.rand(4)
-    errmsg = "Mismatch shape should raise a RuntimeError"
+
+def test_linop_op_err(rand_buf):
+    mat1 = rand_buf((3, 4))
+    vec1 = rand_buf((3,))
+    vec2 = rand_buf((4,))
     linop1 = LinOp1(mat1)
     linop2 = LinOp2(mat1)
 
-    try:
+    # mismatch shape should raise a RuntimeError
+    with pytest.raises(RuntimeError):
         linop1.mv(vec1)
-        assert False, errmsg
-    except RuntimeError:
-        pass
 
-    try:
+    with pytest.raises(RuntimeError):
         linop1.mm(mat1)
-        assert False, errmsg
-    except RuntimeError:
-        pass
 
-    try:
+    with pytest.raises(RuntimeError):
         linop1.rmv(vec2)
-        assert False, errmsg
-    except RuntimeError:
-        pass
 
-    try:
+    with pytest.raises(RuntimeError):
         linop1.rmm(mat1.transpose(-2, -1))
-        assert False, errmsg
-    except RuntimeError:
-        pass
 
-    try:
+    with pytest.raises(RuntimeError):
         linop1.matmul(linop2)
-        assert False, errmsg
-    except RuntimeError:
-        pass
 
-    try:
+    with pytest.raises(RuntimeError):
         linop1.H + linop2
-        assert False, errmsg
-    except RuntimeError:
-        pass
 
-def test_check_linop():
-    mat1 = torch.rand(3, 4)
+def test_check_linop(rand_buf):
+    mat1 = rand_buf((3, 4))
     linop1 = LinOp1(mat1)
     nlinop1 = NotLinOp1(mat1)
 
@@ -274,11 +316,9 @@ def test_check_linop():
         assert "slow down" in str(w[0].message)
 
     with warnings.catch_warnings(record=True) as w:
-        try:
+        # AssertionError must be raised for non-LinearOperator
+        with pytest.raises(AssertionError):
             nlinop1.check()
-            assert False, "AssertionError must be raised for non-LinearOperator"
-        except AssertionError:
-            pass
         assert len(w) == 1
         assert "slow down" in str(w[0].message)
 
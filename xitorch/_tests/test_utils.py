@@ -4,6 +4,7 @@ import pytest
 import torch
 from xitorch._utils.unique import Uniquifier
 from xitorch._utils.decorators import deprecated
+from xitorch._utils.misc import TensorNonTensorSeparator
 from xitorch._utils.tensor import create_random_square_matrix, \
     create_random_ortho_matrix
 
@@ -77,6 +78,44 @@ def test_uniquifier_error():
     except RuntimeError:
         pass
 
+def test_tensor_nontensor_separator():
+    a = torch.rand(2, requires_grad=True)
+    b = torch.rand(3)
+    params = [1, a, "x", b, a]
+
+    # b does not require grad, so it is a nontensor param with varonly
+    sep = TensorNonTensorSeparator(params)
+    assert sep.ntensors() == 2
+    assert sep.nnontensors() == 3
+    assert not sep.alltensors
+    tensor_params = sep.get_tensor_params()
+    assert tensor_params[0] is a
+    assert tensor_params[1] is a
+
+    a1 = torch.rand(2, requires_grad=True)
+    a2 = torch.rand(2, requires_grad=True)
+    res = sep.reconstruct_params([a1, a2])
+    assert len(res) == len(params)
+    assert res[0] == 1
+    assert res[1] is a1
+    assert res[2] == "x"
+    assert res[3] is b
+    assert res[4] is a2
+
+    res = sep.reconstruct_params([a1, a2], [2, "y", None])
+    assert res[0] == 2
+    assert res[2] == "y"
+    assert res[3] is None
+
+    with pytest.raises(ValueError):
+        sep.reconstruct_params([a1])
+
+    # all tensors are included without varonly
+    sep = TensorNonTensorSeparator([a, b], varonly=False)
+    assert sep.alltensors
+    tensor_params = [a1, b]
+    assert sep.reconstruct_params(tensor_params) is tensor_params
+
 def test_deprecated_func():
     with warnings.catch_warnings(record=True) as w:
         a = deprfunc()
@@ -1,5 +1,7 @@
 import re
 import ast
+import functools
+from typing import Tuple
 
 __all__ = ["get_attr", "set_attr", "del_attr"]
 
@@ -16,11 +18,14 @@ def del_attr(obj, name):
     return _del_attr(obj, _preproc_name(name))
 
 
+def _getattr_fcn(obj, name):
+    return getattr(obj, name)
+
+def _getitem_fcn(obj, key):
+    return obj.__getitem__(key)
+
 def _get_attr(obj, names):
-    attrfcn = lambda obj, name: getattr(obj, name)
-    dictfcn = lambda obj, key: obj.__getitem__(key)
-    listfcn = lambda obj, key: obj.__getitem__(key)
-    return _traverse_attr(obj, names, attrfcn, dictfcn, listfcn)
+    return _traverse_attr(obj, names, _getattr_fcn, _getitem_fcn, _getitem_fcn)
 
 def _set_attr(obj, names, val):
     attrfcn = lambda obj, name: setattr(obj, name, val)
@@ -38,14 +43,18 @@ def _del_attr(obj, names):
     return _traverse_attr(obj, names, attrfcn, dictfcn, listfcn)
 
 
-def _preproc_name(name):
-    return sp.findall(name)
+# the same names are get/set repeatedly (e.g. every time the parameters of a
+# pure function are swapped), so the split names are cached
+@functools.lru_cache(maxsize=1024)
+def _preproc_name(name: str) -> Tuple[str, ...]:
+    return tuple(sp.findall(name))
 
 def _traverse_attr(obj, names, attrfcn, dictfcn, listfcn):
-    if len(names) == 1:
-        return _applyfcn(obj, names[0], attrfcn, dictfcn, listfcn)
-    else:
-        return _applyfcn(_get_attr(obj, names[:-1]), names[-1], attrfcn, dictfcn, listfcn)
+    # walk down to the parent of the last name without recursion, then apply
+    # the functions only to the last name
+    for i in range(len(names) - 1):
+        obj = _applyfcn(obj, names[i], _getattr_fcn, _getitem_fcn, _getitem_fcn)
+    return _applyfcn(obj, names[-1], attrfcn, dictfcn, listfcn)
 
 def _applyfcn(obj, name, attrfcn, dictfcn, listfcn):
     if name[0] == "[":
@@ -1,4 +1,5 @@
 import contextlib
+import numpy as np
 import torch
 import copy
 from typing import Mapping, Callable, Union, Dict, List
@@ -53,20 +54,31 @@ class TensorNonTensorSeparator(object):
         Params is a list of tensor or non-tensor to be splitted into
         tensor/non-tensor
         """
-        self.tensor_idxs = []
+        tensor_idxs = []
         self.tensor_params = []
-        self.nontensor_idxs = []
+        nontensor_idxs = []
         self.nontensor_params = []
         self.nparams = len(params)
+        tensor_type = torch.Tensor
+        allvars = not varonly
         for (i, p) in enumerate(params):
-            if isinstance(p, torch.Tensor) and ((varonly and p.requires_grad) or (not varonly)):
-                self.tensor_idxs.append(i)
+            if isinstance(p, tensor_type) and (allvars or p.requires_grad):
+                tensor_idxs.append(i)
                 self.tensor_params.append(p)
             else:
-                self.nontensor_idxs.append(i)
+                nontensor_idxs.append(i)
                 self.nontensor_params.append(p)
+        self.tensor_idxs = np.asarray(tensor_idxs, dtype=np.intp)
+        self.nontensor_idxs = np.asarray(nontensor_idxs, dtype=np.intp)
         self.alltensors = len(self.tensor_idxs) == self.nparams
 
+        # params[i] == [*tensor_params, *nontensor_params][self._perm[i]]
+        # stored as a list because indexing a list with python ints is faster
+        # than with numpy integers
+        perm = np.empty(self.nparams, dtype=np.intp)
+        perm[np.concatenate((self.tensor_idxs, self.nontensor_idxs))] = np.arange(self.nparams)
+        self._perm = perm.tolist()
+
     def get_tensor_params(self):
         return self.tensor_params
 
@@ -77,22 +89,24 @@ class TensorNonTensorSeparator(object):
         return len(self.nontensor_idxs)
 
     def reconstruct_params(self, tensor_params, nontensor_params=None):
+        # the most common case, so return it before doing anything else
+        if self.alltensors:
+            return tensor_params
+
         if nontensor_params is None:
             nontensor_params = self.nontensor_params
-        if len(tensor_params) + len(nontensor_params) != self.nparams:
+        nparams = len(tensor_params) + len(nontensor_params)
+        if nparams != self.nparams:
             raise ValueError(
                 "The total length of tensor and nontensor params "
                 "do not match with the expected length: %d instead of %d" %
-                (len(tensor_params) + len(nontensor_params), self.nparams))
-        if self.alltensors:
-            return tensor_params
+                (nparams, self.nparams))
 
-        params = [None for _ in range(self.nparams)]
-        for nidx, p in zip(self.nontensor_idxs, nontensor_params):
-            params[nidx] = p
-        for idx, p in zip(self.tensor_idxs, tensor_params):
-            params[idx] = p
-        return params
+        # a single gather with the precomputed permutation. Scattering into a
+        # numpy object array is not used here: numpy tries to convert the
+        # tensors (failing for tensors requiring grad) and it is much slower
+        combined = [*tensor_params, *nontensor_params]
+        return [combined[j] for j in self._perm]
 
 class TensorPacker(object):
     def __init__(self, tensors):